@@ -7,28 +7,95 @@
 # gradio — the UI framework. Import as 'gr' — standard convention.
 import gradio as gr
 
+# os — used to check an uploaded file's size before reading it
+import os
+
+# asyncio — runs blocking file reads in a worker thread
+import asyncio
+
 # pathlib.Path — creates file paths that work on Windows, Mac, Linux
 from pathlib import Path
 
-# datetime — generates timestamps for unique output filenames
-from datetime import datetime
+# time, itertools — a timestamp plus a counter for unique output filenames
+import time
+import itertools
+
+# aiofiles — async file writes. A plain open().write() would block the
+# event loop and freeze every other user's stream while it runs.
+import aiofiles
 
 # stream_pipeline — our three-agent pipeline from Phase 3.
 # app.agents means: go into app/, find agents.py, import from it.
 from app.agents import stream_pipeline
 
 
-# ── Helper: save docs to disk for download ────────────────────────────────
+# File buffer size — 256 KB. Python's default (8 KB) means many small
+# writes for a large document; one big buffer is flushed in one go.
+FILE_BUFFER_SIZE = 1 << 18
+
+# Uploads smaller than this (64 KB) are simply read in one call —
+# preallocating a buffer only pays off for large files.
+SMALL_FILE_SIZE = 64 * 1024
+
+
+# Output folder for downloadable docs — created once, when the app starts
+TEMP_DIR = Path("temp")
+TEMP_DIR.mkdir(exist_ok=True)
+
+# Counts up 0, 1, 2, ... so two runs in the same second never share
+# (or delete) one file.
+_file_counter = itertools.count()
+
+
+# ── Helper: pick a file path for the downloadable docs ───────────────────
+
+def documentation_path() -> Path:
+    """Return a new, unique .md path inside the temp/ folder."""
+    stamp = f"{int(time.time())}_{next(_file_counter)}"
+    return TEMP_DIR / f"documentation_{stamp}.md"
+
 
-def save_documentation(content: str) -> str:
-    """Save documentation string to a .md file. Returns the file path."""
-    temp_dir = Path("temp")
-    temp_dir.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = temp_dir / f"documentation_{timestamp}.md"
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(content)
-    return str(filepath)
+# ── Helper: read an uploaded file ─────────────────────────────────────────
+
+def _decode(data: bytes | bytearray) -> str:
+    # Match what text-mode open() used to return: "utf-8-sig" drops the
+    # byte-order mark many Windows editors write, and Windows / old Mac
+    # line endings become "\n" so they never reach the prompts or the
+    # cache key.
+    text = data.decode("utf-8-sig")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _read_upload_sync(path: str) -> str:
+    """Read an uploaded source file as UTF-8 text. Blocking — see below."""
+    size = os.path.getsize(path)
+    with open(path, "rb", buffering=FILE_BUFFER_SIZE) as f:
+        if size < SMALL_FILE_SIZE:
+            return _decode(f.read())
+
+        # Large file: read straight into one preallocated bytearray.
+        # f.read() would build a separate bytes object first, so the
+        # file would briefly sit in memory twice before decoding.
+        buf = bytearray(size)
+        with memoryview(buf) as view:
+            filled = 0
+            while filled < size:
+                n = f.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+
+    # The file may have shrunk between getsize() and reading it
+    del buf[filled:]
+    return _decode(buf)
+
+
+async def read_upload(path: str) -> str:
+    """Read an uploaded file without blocking the event loop."""
+    # Both the read AND the UTF-8 decode of a large file take real time.
+    # Running them in a worker thread keeps every other user's stream
+    # flowing in the meantime.
+    return await asyncio.to_thread(_read_upload_sync, path)
 
 
 # ── Main generate function — called by the Generate button ────────────────
@@ -40,8 +107,7 @@ async def generate(code_input: str, file_input, language: str):
     """
     # If a file was uploaded, read it. Otherwise use pasted code.
     if file_input is not None:
-        with open(file_input.name, "r", encoding="utf-8") as f:
-            code = f.read()
+        code = await read_upload(file_input.name)
     else:
         code = code_input
 
@@ -50,16 +116,32 @@ async def generate(code_input: str, file_input, language: str):
         yield ("⚠️ Please paste code or upload a file first.", None)
         return
 
-    # Stream the pipeline — yield each chunk to the UI as it arrives
+    # Stream the pipeline — yield each chunk to the UI as it arrives.
+    # The final documentation is also written to disk as it streams in
+    # (sink=f.write, batched to one write per UI update), so the download
+    # is ready the moment streaming ends without holding and re-writing
+    # the whole document afterwards.
+    filepath = documentation_path()
     final_output = ""
-    async for chunk in stream_pipeline(code, language):
-        final_output = chunk
-        yield (chunk, None)
-
-    # Pipeline done — save and offer the download
-    if final_output.strip():
-        download_path = save_documentation(final_output)
-        yield (final_output, download_path)
+    try:
+        async with aiofiles.open(
+            filepath, "w", encoding="utf-8", buffering=FILE_BUFFER_SIZE
+        ) as f:
+            async for chunk in stream_pipeline(code, language, sink=f.write):
+                final_output = chunk
+                yield (chunk, None)
+    except BaseException:
+        # An LLM error, or the user closed the page mid-stream — don't
+        # leave a half-written file behind in temp/
+        filepath.unlink(missing_ok=True)
+        raise
+
+    # Pipeline done — offer the download.
+    # Warnings (e.g. code that failed to parse) are not worth downloading.
+    if final_output.strip() and not final_output.startswith("⚠️"):
+        yield (final_output, str(filepath))
+    else:
+        filepath.unlink(missing_ok=True)
 
 
 # ── Gradio UI ─────────────────────────────────────────────────────────────
@@ -132,4 +214,13 @@ with gr.Blocks(title="Codebase Doc Generator") as demo:
 # ── Launch ────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    # Gradio's queue: up to LLM_CONCURRENCY generations run at once (each
+    # makes one LLM call at a time) and up to QUEUE_SIZE more wait in
+    # line. Beyond that, new requests are turned away instead of piling up.
+    demo.queue(
+        default_concurrency_limit=int(os.getenv("LLM_CONCURRENCY", "8")),
+        max_size=int(os.getenv("QUEUE_SIZE", "64"))
+    )
+    # Gradio serves through uvicorn, which switches to the faster uvloop
+    # event loop by itself whenever uvloop is installed — no setup needed.
     demo.launch(inbrowser=True)
\ No newline at end of file
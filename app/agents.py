@@ -13,22 +13,37 @@
 # ================================================================
 
 import os
+import re
+import ast
+import time
+import asyncio
+import hashlib
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Agent  — defines one AI agent (name, instructions, model)
-# Runner — executes an agent and returns its output
 # set_tracing_disabled — silences 401 errors from OpenRouter usage
-from agents import Agent, Runner, set_tracing_disabled
+from agents import Agent, set_tracing_disabled
+
+# LLMCache — wraps Runner.run so repeated prompts skip the LLM call
+from app.llm_cache import LLMCache
+
+# static_analyze — local ast/tree-sitter replacement for the Code Analyst
+from app.static_analyzer import static_analyze
 
 # AsyncGenerator — a type hint for functions that yield values
 # asynchronously. Used to type our streaming function correctly.
-from typing import AsyncGenerator
+# AsyncIterable — anything we can loop over with "async for".
+# Awaitable, Callable — used to type the optional output "sink" below.
+from typing import AsyncGenerator, AsyncIterable, Awaitable, Callable
 
 # Disable tracing FIRST — before any agent is created or run
 set_tracing_disabled(True)
 
-# Load .env so os.getenv() can find our API key and model setting
-load_dotenv(override=True)
+# Load .env so os.getenv() can find our API key and model setting.
+# override=False — variables already set in the real environment
+# (e.g. deployment secrets) win over the values in .env.
+load_dotenv(override=False)
 
 # Point the Agents SDK at OpenRouter instead of OpenAI
 os.environ["OPENAI_API_KEY"]  = os.getenv("OPENROUTER_API_KEY")
@@ -37,6 +52,27 @@ os.environ["OPENAI_BASE_URL"] = "https://openrouter.ai/api/v1"
 # Read the model name from .env — fallback to gpt-4o-mini if not set
 MODEL = os.getenv("MODEL", "openai/gpt-4o-mini")
 
+# Each agent can use its own model. The Analyst only extracts structure,
+# so it defaults to a small, fast model whatever MODEL is; the Writer and
+# Reviewer produce what the user reads, so they default to MODEL.
+ANALYST_MODEL  = os.getenv("ANALYST_MODEL", "openai/gpt-4o-mini")
+WRITER_MODEL   = os.getenv("WRITER_MODEL", MODEL)
+REVIEWER_MODEL = os.getenv("REVIEWER_MODEL", MODEL)
+
+# One shared response cache for every pipeline run.
+# Built after load_dotenv() so it can read its settings from .env.
+cache = LLMCache.from_env()
+
+# Step 1 normally runs locally (app/static_analyzer.py). Set
+# USE_LLM_ANALYST=1 to always use the LLM Code Analyst instead. Code the
+# static analyser cannot handle falls back to the LLM automatically.
+USE_LLM_ANALYST = os.getenv("USE_LLM_ANALYST", "0") == "1"
+
+# How often (in seconds) the streaming UI is allowed to re-render.
+# Models emit 50–200 tokens per second; re-rendering a large Markdown
+# document that often burns CPU in both the server and the browser.
+STREAM_FLUSH_INTERVAL = 0.05
+
 
 
 
@@ -53,12 +89,12 @@ MODEL = os.getenv("MODEL", "openai/gpt-4o-mini")
 # Job: read raw code → produce a structured analysis.
 # Does NOT write documentation. Only analyses and extracts.
 #
-# We define agents at module level (outside any function) so they are
-# created once when the file loads — not recreated on every pipeline run.
-# This is more efficient and is standard Python practice.
-code_analyst = Agent(
-    name="Code Analyst",
-    instructions="""
+# The instructions live in a module-level constant. The Agent itself is
+# built lazily by get_code_analyst() the first time a pipeline runs —
+# not while app.py is importing this file — so the UI starts faster.
+# @lru_cache remembers the result per model: after the first call the
+# same Agent object is returned, so it is still created only once.
+CODE_ANALYST_INSTRUCTIONS = """
     You are an expert code analyst specialising in Python and JavaScript.
     Your job is to read code and produce a thorough, structured analysis.
 
@@ -82,9 +118,17 @@ code_analyst = Agent(
     Do not add filler or padding.
     Your output goes directly to a documentation writer agent —
     completeness and accuracy are critical.
-    """,
-    model=MODEL
-)
+    """
+
+
+@lru_cache(maxsize=None)
+def get_code_analyst(model: str = ANALYST_MODEL) -> Agent:
+    """Return the Code Analyst agent for this model — built once, then reused."""
+    return Agent(
+        name="Code Analyst",
+        instructions=CODE_ANALYST_INSTRUCTIONS,
+        model=model
+    )
 
 
 
@@ -102,12 +146,11 @@ code_analyst = Agent(
 # Job: receive structured analysis → write professional Markdown docs.
 # Receives: the Code Analyst's output + the original code for reference.
 # Produces: complete Markdown documentation ready for a README or wiki.
-doc_writer = Agent(
-    name="Documentation Writer",
-    instructions="""
+DOC_WRITER_INSTRUCTIONS = """
     You are a professional technical documentation writer.
     You will receive a structured analysis of Python or JavaScript code,
-    along with the original code for reference.
+    usually along with the original code for reference.
+    For very large codebases only the analysis is provided.
 
     Produce complete, professional documentation in Markdown format.
     Your output must contain exactly these sections:
@@ -141,9 +184,17 @@ doc_writer = Agent(
     Write for a developer audience. Be precise and professional.
     Use proper Markdown throughout. Do not add extra commentary
     outside these sections.
-    """,
-    model=MODEL
-)
+    """
+
+
+@lru_cache(maxsize=None)
+def get_doc_writer(model: str = WRITER_MODEL) -> Agent:
+    """Return the Documentation Writer agent for this model — built once, then reused."""
+    return Agent(
+        name="Documentation Writer",
+        instructions=DOC_WRITER_INSTRUCTIONS,
+        model=model
+    )
 
 
 
@@ -164,9 +215,7 @@ doc_writer = Agent(
 #
 # This agent sees BOTH the docs AND the original code — it can
 # catch errors the writer made by cross-referencing them directly.
-quality_reviewer = Agent(
-    name="Quality Reviewer",
-    instructions="""
+QUALITY_REVIEWER_INSTRUCTIONS = """
     You are a senior technical documentation reviewer.
     You will receive generated documentation AND the original code it describes.
 
@@ -190,9 +239,179 @@ quality_reviewer = Agent(
     Return the complete, corrected documentation in full Markdown.
     Do not add commentary about what you changed — just return the
     final, polished documentation and nothing else.
-    """,
-    model=MODEL
+    """
+
+
+@lru_cache(maxsize=None)
+def get_quality_reviewer(model: str = REVIEWER_MODEL) -> Agent:
+    """Return the Quality Reviewer agent for this model — built once, then reused."""
+    return Agent(
+        name="Quality Reviewer",
+        instructions=QUALITY_REVIEWER_INSTRUCTIONS,
+        model=model
+    )
+
+
+
+
+# Prompt builders — shared by run_pipeline() and stream_pipeline()
+
+# Every prompt that includes the source code puts it FIRST, as exactly
+# the same block of text. LLM providers (OpenRouter, OpenAI, Anthropic)
+# cache the longest prefix they have already seen, so identical bytes at
+# the start of a message can be served from the provider's prompt cache
+# instead of being re-processed — on repeat runs this is the bulk of the
+# input tokens. Anything that changes between steps goes AFTER the code.
+
+# Above this many characters the Writer gets only the analysis, not the
+# code — but ONLY when the analysis came from the LLM Code Analyst, which
+# already describes behaviour and edge cases. The static analysis is just
+# a skeleton of signatures and docstrings, so the Writer always gets the
+# code alongside it.
+WRITER_CODE_LIMIT = 50_000
+
+
+# The fixed parts of every prompt, built once when the module loads.
+# Each prompt is then assembled with "".join() — a single copy of the
+# (possibly very large) code and agent output, no f-string reformatting.
+LANGUAGES = ("Python", "JavaScript")
+
+_CODE_HEADER = "--- ORIGINAL {upper} CODE ---\n"
+_ANALYST_TASK = "\n\nAnalyse the {language} code above thoroughly."
+_QUICK_TASK = (
+    "\n\nThis is a short {language} snippet. First analyse it yourself: "
+    "every parameter, return value, exception and edge case. Then write "
+    "the documentation. Before answering, check every detail against the "
+    "code above and fix anything inaccurate. Return only the final "
+    "documentation."
+)
+_WRITER_HEADER = (
+    "Write complete professional documentation using this analysis:"
+    "\n\n--- ANALYSIS ---\n"
 )
+_REVIEWER_HEADER = (
+    "\n\nReview and polish this documentation against the original code."
+    "\n\n--- DOCUMENTATION TO REVIEW ---\n"
+)
+
+# (template, language) → filled-in text, precomputed for LANGUAGES
+_FRAGMENTS = {
+    (template, language): template.format(
+        language=language, upper=language.upper()
+    )
+    for template in (_CODE_HEADER, _ANALYST_TASK, _QUICK_TASK)
+    for language in LANGUAGES
+}
+
+
+def _fragment(template: str, language: str) -> str:
+    """Look up a precomputed fragment; format on the fly for other languages."""
+    text = _FRAGMENTS.get((template, language))
+    if text is None:
+        text = template.format(language=language, upper=language.upper())
+    return text
+
+
+def _analyst_prompt(code: str, language: str) -> str:
+    return "".join((
+        _fragment(_CODE_HEADER, language),
+        code,
+        _fragment(_ANALYST_TASK, language)
+    ))
+
+
+def _writer_prompt(
+    code: str, language: str, analysis: str, static: bool
+) -> str:
+    # static — True when the analysis came from static_analyze()
+    if not static and len(code) > WRITER_CODE_LIMIT:
+        return "".join((_WRITER_HEADER, analysis))
+    return "".join((
+        _fragment(_CODE_HEADER, language),
+        code,
+        "\n\n",
+        _WRITER_HEADER,
+        analysis
+    ))
+
+
+def _reviewer_prompt(code: str, language: str, draft_docs: str) -> str:
+    return "".join((
+        _fragment(_CODE_HEADER, language),
+        code,
+        _REVIEWER_HEADER,
+        draft_docs
+    ))
+
+
+def _quick_prompt(code: str, language: str) -> str:
+    # One prompt that does all three jobs — used for tiny inputs only
+    return "".join((
+        _fragment(_CODE_HEADER, language),
+        code,
+        _fragment(_QUICK_TASK, language)
+    ))
+
+
+
+
+# Fast local gate — decides how much of the pipeline a submission needs
+
+# Three LLM calls take ~30 seconds. That is wasted on a 5-line snippet,
+# and completely wasted on code that does not even parse. _triage() runs
+# a cheap local check first:
+#   - "rejected" — Python that fails ast.parse(). No LLM call at all.
+#   - "quick"    — tiny input (under QUICK_TOKEN_LIMIT tokens) with at
+#                  most one function or class. One combined LLM call.
+#   - "full"     — everything else. The normal three-agent pipeline.
+
+# Rough token budget for the quick path (≈ 4 characters per token)
+QUICK_TOKEN_LIMIT = 200
+
+# Counts JavaScript function and class definitions — a heuristic only
+_JS_DEFINITION = re.compile(r"\bfunction\b|=>|\bclass\b")
+
+# How many submissions took each path since the app started
+PIPELINE_STATS = {"full": 0, "quick": 0, "rejected": 0}
+
+
+def _triage(
+    code: str, language: str
+) -> tuple[str, str | None, ast.Module | None]:
+    """
+    Classify a submission as 'rejected', 'quick' or 'full'.
+
+    Returns:
+        (path, message, tree) — message is the error text for 'rejected',
+        otherwise None. tree is the parsed Python module, handed on to
+        static_analyze() so large files are only parsed once.
+    """
+    n_tokens = len(code) // 4
+    tree = None
+
+    if language == "Python":
+        try:
+            # CPython ignores a leading byte-order mark; ast.parse() on a
+            # str does not, so strip the one Windows editors like to write
+            tree = ast.parse(code.removeprefix("\ufeff"))
+        except SyntaxError as e:
+            return "rejected", (
+                f"⚠️ This doesn't look like valid Python — line {e.lineno}: "
+                f"{e.msg}. Fix the syntax error (or pick the right language) "
+                "and try again."
+            ), None
+        n_definitions = sum(
+            isinstance(
+                node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            )
+            for node in ast.walk(tree)
+        )
+    else:
+        n_definitions = len(_JS_DEFINITION.findall(code))
+
+    if n_tokens < QUICK_TOKEN_LIMIT and n_definitions <= 1:
+        return "quick", None, tree
+    return "full", None, tree
 
 
 
@@ -227,50 +446,71 @@ async def run_pipeline(code: str, language: str) -> str:
     if not code.strip():
         return "⚠️ No code was provided. Please paste or upload a file."
 
+    # Fast local gate — reject broken code, shortcut tiny snippets.
+    # Parsing a large file takes real CPU time, so it runs in a worker
+    # thread instead of stalling every other request on the event loop.
+    path, message, tree = await asyncio.to_thread(_triage, code, language)
+    PIPELINE_STATS[path] += 1
+    if path == "rejected":
+        return message
+
+    # Embed the code once for the semantic cache (None when disabled).
+    # create_task() starts it in the background instead of waiting here,
+    # so it runs at the same time as the local static analysis.
+    # Every agent call below reuses this same task.
+    embedding = asyncio.create_task(cache.embed(code, language))
+
+    if path == "quick":
+        return await cache.get_or_run(
+            get_doc_writer(), _quick_prompt(code, language), embedding
+        )
+
     # ── Step 1: Code Analyst ──────────────────────────────────────────────
     # We tell the analyst what language it's looking at so it applies
     # the right mental model (Python conventions vs JavaScript conventions).
-    analysis_result = await Runner.run(
-        code_analyst,
-        f"""Analyse this {language} code thoroughly:
-
-{code}"""
-    )
-    # Extract the plain text from the result object
-    analysis = analysis_result.final_output
+    # First try the local static analyser — milliseconds, no LLM call.
+    # It reuses the tree _triage() already parsed, and walking a large
+    # tree is still CPU work, so it runs in a worker thread.
+    analysis = None
+    if not USE_LLM_ANALYST:
+        analysis = await asyncio.to_thread(
+            static_analyze, code, language, tree
+        )
+    static = analysis is not None
+
+    # Otherwise ask the LLM Code Analyst.
+    # cache.get_or_run() returns the plain text output — from the cache
+    # if we have seen this prompt before, otherwise from Runner.run().
+    if analysis is None:
+        analysis = await cache.get_or_run(
+            get_code_analyst(),
+            _analyst_prompt(code, language),
+            embedding
+        )
 
     # ── Step 2: Documentation Writer — HANDOFF ────────────────────────────
-    # We pass BOTH the analyst's output AND the original code.
+    # We pass BOTH the analyst's output AND the original code
+    # (the code is left out for very large inputs analysed by the LLM —
+    # see WRITER_CODE_LIMIT).
     # The writer uses the analysis as its primary source,
     # but can cross-reference the original code if needed.
-    doc_result = await Runner.run(
-        doc_writer,
-        f"""Write complete professional documentation using this analysis:
-
---- ANALYSIS ---
-{analysis}
-
---- ORIGINAL {language.upper()} CODE (for reference) ---
-{code}"""
+    draft_docs = await cache.get_or_run(
+        get_doc_writer(),
+        _writer_prompt(code, language, analysis, static),
+        embedding
     )
-    draft_docs = doc_result.final_output
 
     # ── Step 3: Quality Reviewer — FINAL HANDOFF ──────────────────────────
     # The reviewer sees the draft documentation AND the original code.
     # It can catch errors by comparing them directly.
-    review_result = await Runner.run(
-        quality_reviewer,
-        f"""Review and polish this documentation against the original code.
-
---- DOCUMENTATION TO REVIEW ---
-{draft_docs}
-
---- ORIGINAL {language.upper()} CODE ---
-{code}"""
+    final_docs = await cache.get_or_run(
+        get_quality_reviewer(),
+        _reviewer_prompt(code, language, draft_docs),
+        embedding
     )
 
     # Return the final polished documentation string
-    return review_result.final_output
+    return final_docs
 
 
 
@@ -285,69 +525,297 @@ async def run_pipeline(code: str, language: str) -> str:
 
 # The AsyncGenerator[str, None] return type hint means: "this function yields strings asynchronously and never returns a final value." The None is the send type — not important to understand right now.
 
-async def stream_pipeline(
-    code: str,
-    language: str
-) -> AsyncGenerator[str, None]:
-    """
-    Streaming version of run_pipeline().
+# _coalesce() — batches token deltas into at most one UI update per 50ms
 
-    Yields progress updates after each agent completes so the
-    Gradio UI can show the user what is happening in real time.
+# Yielding on every single token would make Gradio re-render the whole
+# Markdown output dozens of times per second. This helper collects the
+# deltas and only yields the running text when STREAM_FLUSH_INTERVAL has
+# passed — plus once more at the end so nothing is ever left out.
 
-    Args:
-        code:     The raw source code to document.
-        language: 'Python' or 'JavaScript'.
+async def _coalesce(
+    deltas: AsyncIterable[str],
+    interval: float = STREAM_FLUSH_INTERVAL
+) -> AsyncGenerator[str, None]:
+    """Yield the accumulated text of a delta stream, throttled to interval."""
+    # Collect pieces in a list and join only when flushing — repeated
+    # string += on a growing document copies it over and over.
+    parts: list[str] = []
+    pending = False
+    last_flush = time.monotonic()
+
+    async for delta in deltas:
+        parts.append(delta)
+        pending = True
+        now = time.monotonic()
+        if now - last_flush >= interval:
+            text = "".join(parts)
+            parts = [text]
+            pending = False
+            last_flush = now
+            yield text
+
+    # Stream finished — flush whatever arrived since the last update
+    if pending:
+        yield "".join(parts)
+
+
+# _tee() — passes each delta to a sink (e.g. a file) on its way through
+
+async def _tee(
+    deltas: AsyncIterable[str],
+    sink: Callable[[str], Awaitable[object]] | None
+) -> AsyncGenerator[str, None]:
+    """Await sink(delta) for every delta, then yield it unchanged."""
+    async for delta in deltas:
+        if sink is not None:
+            await sink(delta)
+        yield delta
 
-    Yields:
-        Strings — status messages and partial/final documentation.
-    """
+
+async def _stream_pipeline(
+    code: str,
+    language: str,
+    sink: Callable[[str], Awaitable[object]] | None = None
+) -> AsyncGenerator[str, None]:
+    """The streaming pipeline itself — called via stream_pipeline()."""
 
     # Guard: empty input check — same as run_pipeline()
     if not code.strip():
         yield "⚠️ No code was provided. Please paste or upload a file."
         return
 
+    # Fast local gate — same as run_pipeline()
+    path, message, tree = await asyncio.to_thread(_triage, code, language)
+    PIPELINE_STATS[path] += 1
+    if path == "rejected":
+        yield message
+        return
+
+    # Embed once for the semantic cache — same as run_pipeline().
+    embedding = asyncio.create_task(cache.embed(code, language))
+
+    if path == "quick":
+        status = (
+            "⏳ Short snippet — Documentation Writer is documenting it "
+            "in one pass..."
+        )
+        yield status
+        final_docs = ""
+        async for final_docs in _coalesce(_tee(cache.stream_or_run(
+            get_doc_writer(), _quick_prompt(code, language), embedding
+        ), sink)):
+            yield f"{status}\n\n{final_docs}"
+        yield final_docs
+        return
+
     # yield sends a value to the UI immediately and then keeps running.
     # The Gradio component replaces its current content with each new value.
-    yield "⏳ Step 1 of 3 — Code Analyst is reading your code..."
+    status = "⏳ Step 1 of 3 — Code Analyst is reading your code..."
+    yield status
 
     # ── Step 1: Code Analyst ──────────────────────────────────────────────
-    analysis_result = await Runner.run(
-        code_analyst,
-        f"Analyse this {language} code thoroughly:\n\n{code}"
-    )
-    analysis = analysis_result.final_output
-
-    yield "⏳ Step 2 of 3 — Documentation Writer is drafting the docs..."
+    # Local static analysis first — same as run_pipeline().
+    analysis = None
+    if not USE_LLM_ANALYST:
+        analysis = await asyncio.to_thread(
+            static_analyze, code, language, tree
+        )
+    static = analysis is not None
+
+    if analysis is not None:
+        yield f"{status}\n\n{analysis}"
+    else:
+        # stream_or_run() yields small pieces of text (deltas) as the
+        # model writes them. _coalesce() joins them into the running
+        # total and hands it back every 50ms — we re-send the whole thing
+        # each time, because Gradio replaces the output on every yield.
+        analysis = ""
+        async for analysis in _coalesce(cache.stream_or_run(
+            get_code_analyst(),
+            _analyst_prompt(code, language),
+            embedding
+        )):
+            yield f"{status}\n\n{analysis}"
+
+    status = "⏳ Step 2 of 3 — Documentation Writer is drafting the docs..."
+    yield status
 
     # ── Step 2: Documentation Writer ──────────────────────────────────────
-    doc_result = await Runner.run(
-        doc_writer,
-        f"""Write complete professional documentation using this analysis:
+    # The draft appears live under the status line as it is written.
+    draft_docs = ""
+    async for draft_docs in _coalesce(cache.stream_or_run(
+        get_doc_writer(),
+        _writer_prompt(code, language, analysis, static),
+        embedding
+    )):
+        yield f"{status}\n\n{draft_docs}"
+
+    status = "⏳ Step 3 of 3 — Quality Reviewer is checking and polishing..."
+    yield f"{status}\n\n{draft_docs}"
 
---- ANALYSIS ---
-{analysis}
+    # ── Step 3: Quality Reviewer ──────────────────────────────────────────
+    # The reviewed version streams in and replaces the draft.
+    # Each delta also goes to the sink, if one was given.
+    final_docs = ""
+    async for final_docs in _coalesce(_tee(cache.stream_or_run(
+        get_quality_reviewer(),
+        _reviewer_prompt(code, language, draft_docs),
+        embedding
+    ), sink)):
+        yield f"{status}\n\n{final_docs}"
 
---- ORIGINAL {language.upper()} CODE (for reference) ---
-{code}"""
-    )
-    draft_docs = doc_result.final_output
+    # Final yield — the complete polished documentation.
+    # This is the last value sent to the UI, replacing the status message.
+    yield final_docs
 
-    yield "⏳ Step 3 of 3 — Quality Reviewer is checking and polishing..."
 
-    # ── Step 3: Quality Reviewer ──────────────────────────────────────────
-    review_result = await Runner.run(
-        quality_reviewer,
-        f"""Review and polish this documentation against the original code.
 
---- DOCUMENTATION TO REVIEW ---
-{draft_docs}
 
---- ORIGINAL {language.upper()} CODE ---
-{code}"""
-    )
+# Section 7 — Sharing identical runs between users
 
-    # Final yield — the complete polished documentation.
-    # This is the last value sent to the UI, replacing the status message.
-    yield review_result.final_output
\ No newline at end of file
+# If two users (or one user double-clicking) submit exactly the same code
+# at the same time, running the pipeline twice would make every LLM call
+# twice for the same answer. Instead the first request starts ONE run in
+# the background and every identical request that arrives while it is
+# still going subscribes to it. Each subscriber gets its own queue, and
+# the run "broadcasts" everything it produces into all of them.
+
+# The response cache (app/llm_cache.py) handles repeats over time; this
+# handles repeats that overlap in time, before anything is cached.
+
+class _Broadcast:
+    """One in-flight pipeline run, fanned out to every subscriber."""
+
+    def __init__(self):
+        self.subscribers: set[asyncio.Queue] = set()
+        self.task: asyncio.Task | None = None
+        # What a late subscriber needs to catch up: the latest UI chunk
+        # (each chunk is the complete text so far) and the final-doc
+        # deltas already sent to the other subscribers' sinks.
+        self.latest: str | None = None
+        self.final_parts: list[str] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        if self.final_parts:
+            queue.put_nowait(("delta", "".join(self.final_parts)))
+        if self.latest is not None:
+            queue.put_nowait(("chunk", self.latest))
+        self.subscribers.add(queue)
+        return queue
+
+    def publish(self, kind: str, value) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait((kind, value))
+
+    async def delta(self, text: str) -> None:
+        # Used as the pipeline's sink — final-doc deltas go to everyone
+        self.final_parts.append(text)
+        self.publish("delta", text)
+
+
+# sha256(language + code) → the run currently producing that output
+_INFLIGHT: dict[str, _Broadcast] = {}
+
+
+async def _produce(key: str, code: str, language: str, run: _Broadcast):
+    """Run the pipeline once and broadcast its output."""
+    try:
+        async for chunk in _stream_pipeline(code, language, sink=run.delta):
+            run.latest = chunk
+            run.publish("chunk", chunk)
+        run.publish("done", None)
+    except Exception as e:
+        # Every subscriber re-raises the same error
+        run.publish("error", e)
+    finally:
+        _forget(key, run)
+
+
+def _forget(key: str, run: _Broadcast) -> None:
+    # Only remove our own entry — a newer run may already own this key
+    if _INFLIGHT.get(key) is run:
+        del _INFLIGHT[key]
+
+
+async def stream_pipeline(
+    code: str,
+    language: str,
+    sink: Callable[[str], Awaitable[object]] | None = None
+) -> AsyncGenerator[str, None]:
+    """
+    Streaming version of run_pipeline().
+
+    Yields the output of each agent token by token as it is generated,
+    so the Gradio UI shows text within a second instead of waiting for
+    a whole agent to finish. Identical requests that overlap in time
+    share a single pipeline run.
+
+    Args:
+        code:     The raw source code to document.
+        language: 'Python' or 'JavaScript'.
+        sink:     Optional async callable (e.g. an open file's write)
+                  that receives the final documentation piece by piece
+                  as it streams in, batched to one call per UI update.
+                  Intermediate output is not sent.
+
+    Yields:
+        Strings — a status line with the partial output so far, and
+        finally the complete documentation on its own.
+    """
+    key = hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+
+    # Join the identical run already in progress, or start a new one
+    run = _INFLIGHT.get(key)
+    if run is None:
+        run = _Broadcast()
+        _INFLIGHT[key] = run
+        run.task = asyncio.create_task(_produce(key, code, language, run))
+    queue = run.subscribe()
+
+    # Deltas not yet handed to the sink. A sink like aiofiles' write()
+    # costs a worker-thread round trip per call, so instead of one call
+    # per token they are joined and written once per UI update.
+    unwritten: list[str] = []
+
+    async def flush() -> None:
+        if sink is not None and unwritten:
+            await sink("".join(unwritten))
+        unwritten.clear()
+
+    try:
+        while True:
+            # Wait for the next message, then drain everything else that
+            # is already queued. Every delta must reach the sink, but for
+            # the UI only the newest chunk matters — each chunk already
+            # contains all the text so far, so older ones can be skipped.
+            messages = [await queue.get()]
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+
+            chunk = None
+            for kind, value in messages:
+                if kind == "delta":
+                    unwritten.append(value)
+                elif kind == "chunk":
+                    chunk = value
+                elif kind == "error":
+                    raise value
+                elif kind == "done":
+                    await flush()
+                    if chunk is not None:
+                        yield chunk
+                    return
+
+            # A chunk is published right after each _coalesce() flush, so
+            # this writes the sink at most once per STREAM_FLUSH_INTERVAL
+            if chunk is not None:
+                await flush()
+                yield chunk
+    finally:
+        run.subscribers.discard(queue)
+        # Last listener gone (e.g. every user closed the page) — stop the
+        # run instead of paying for LLM output nobody will see.
+        if not run.subscribers and not run.task.done():
+            _forget(key, run)
+            run.task.cancel()
@@ -0,0 +1,412 @@
+# ================================================================
+# app/llm_cache.py
+# Response cache for the three-agent pipeline.
+# Used by app/agents.py — never run directly.
+# ================================================================
+
+# Why cache at all?
+# Every submission costs three remote LLM calls. When a user resubmits
+# the same code (or clicks Generate twice), the answers would be the
+# same — so we remember each agent's output and hand it back instantly
+# instead of paying for the round trip again.
+#
+# Two layers:
+#   1. Exact cache    — keyed by sha256(model + agent name + prompt).
+#   2. Semantic cache — optional. Embeds the submitted code and reuses
+#      an earlier answer when the new code is nearly identical
+#      (cosine similarity above a threshold), e.g. only reformatted.
+#      It is fuzzy by design: code that differs in one operator or
+#      constant can still score above the threshold, which is why it is
+#      off by default. If embedding fails, it switches itself off and
+#      the exact cache carries on alone.
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, Awaitable, NamedTuple, Protocol
+
+# Agent  — used only as a type hint and to read name/model for the key
+# Runner — executes the agent on a cache miss
+from agents import Agent, Runner
+
+# ResponseTextDeltaEvent — one chunk of text while a response streams in
+from openai.types.responses import ResponseTextDeltaEvent
+
+
+# Cached answers expire after 24 hours by default
+DEFAULT_TTL = 24 * 60 * 60
+
+# Code longer than this many embedding chunks (~1 KB each) skips the
+# semantic cache — embedding a huge file costs more than it could save
+MAX_SEMANTIC_CHUNKS = 64
+
+logger = logging.getLogger(__name__)
+
+
+# ── Backends ──────────────────────────────────────────────────────────────
+#
+# A backend is anything with async get() and set(). The in-memory one
+# below is the default; a Redis or diskcache backend only needs to
+# implement these two methods to be dropped in.
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> str | None: ...
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+
+class MemoryBackend:
+    """In-process LRU cache with a per-entry expiry time."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # key → (expires_at, value). OrderedDict remembers insertion
+        # order, so the first item is always the least recently used.
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        # Mark as recently used
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        # Evict the least recently used entries once we are over the limit
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# ── Semantic index ────────────────────────────────────────────────────────
+#
+# Maps code embeddings to exact-cache keys. A lookup finds the most
+# similar earlier submission for the same agent and returns its key;
+# the value itself still lives in the backend, so expiry and eviction
+# are handled in one place.
+#
+# The embedding model only reads its first 256 word-pieces (~1 KB of
+# code) and silently drops the rest. So code is split into line-aligned
+# chunks that each fit, every chunk is embedded, and two submissions
+# match only when they have the same number of chunks and EVERY pair of
+# chunks is above the threshold — one changed function in a long file
+# is never averaged away.
+
+class SemanticIndex:
+    """Nearest-neighbour lookup over code embeddings."""
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = 0.95,
+        max_entries: int = 256
+    ):
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError(
+                "SEMANTIC_CACHE is enabled but sentence-transformers is not "
+                "installed. Run: uv add sentence-transformers"
+            )
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # The model is loaded on first use, not at import time
+        self._model = None
+        # agent identity → recent (chunk embeddings, cache key) pairs
+        self._entries: dict[
+            str, deque[tuple[list[list[float]], str]]
+        ] = {}
+
+    def embed(self, text: str) -> list[list[float]] | None:
+        """
+        Embed text as one unit-length vector per chunk. Blocking — run
+        in a thread.
+
+        Returns None when the text cannot be embedded faithfully: it is
+        empty, has more than MAX_SEMANTIC_CHUNKS chunks, or has a single
+        line too long for the model (e.g. minified JavaScript).
+        """
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        chunks = self._chunks(text)
+        if not chunks or len(chunks) > MAX_SEMANTIC_CHUNKS:
+            return None
+        return self._model.encode(chunks, normalize_embeddings=True).tolist()
+
+    def _chunks(self, text: str) -> list[str] | None:
+        """Group whole lines into chunks that fit the model's input."""
+        # Leave room for the two special tokens the model adds
+        window = self._model.max_seq_length - 2
+        lines = text.splitlines(keepends=True)
+        if not lines:
+            return []
+        counts = [
+            len(ids) for ids in self._model.tokenizer(
+                lines, add_special_tokens=False, verbose=False
+            )["input_ids"]
+        ]
+
+        chunks, current, used = [], [], 0
+        for line, n in zip(lines, counts):
+            if n > window:
+                return None
+            if used + n > window:
+                chunks.append("".join(current))
+                current, used = [], 0
+            current.append(line)
+            used += n
+        chunks.append("".join(current))
+        return chunks
+
+    def lookup(self, scope: str, vectors: list[list[float]]) -> str | None:
+        """Return the cache key of the closest match above the threshold."""
+        best_key, best_score = None, self.threshold
+        for candidates, key in self._entries.get(scope, ()):
+            if len(candidates) != len(vectors):
+                continue
+            # Vectors are normalised, so the dot product is the cosine.
+            # A match is only as good as its least similar chunk.
+            score = min(
+                sum(a * b for a, b in zip(vector, candidate))
+                for vector, candidate in zip(vectors, candidates)
+            )
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def add(self, scope: str, vectors: list[list[float]], key: str) -> None:
+        entries = self._entries.setdefault(
+            scope, deque(maxlen=self.max_entries)
+        )
+        entries.append((vectors, key))
+
+
+# ── The cache ─────────────────────────────────────────────────────────────
+
+class CodeEmbedding(NamedTuple):
+    """The submitted code's chunk vectors, plus its language."""
+    language: str
+    vectors: list[list[float]]
+
+
+class LLMCache:
+    """Caches each agent's final output, keyed by model, agent and prompt."""
+
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        ttl: float = DEFAULT_TTL,
+        semantic: SemanticIndex | None = None,
+        concurrency: int = 8
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.semantic = semantic
+        # At most `concurrency` LLM calls run at once across ALL users.
+        # Extra calls wait their turn here instead of piling onto the
+        # provider's rate limits and slowing everyone down.
+        self._limit = asyncio.Semaphore(concurrency)
+        # Simple counters — handy when checking the cache is doing its job
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        """Build a cache from LLM_CACHE_*, SEMANTIC_CACHE* and LLM_CONCURRENCY."""
+        semantic = None
+        if os.getenv("SEMANTIC_CACHE", "0") == "1":
+            semantic = SemanticIndex(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+            )
+        return cls(
+            backend=MemoryBackend(int(os.getenv("LLM_CACHE_SIZE", "256"))),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(DEFAULT_TTL))),
+            semantic=semantic,
+            concurrency=int(os.getenv("LLM_CONCURRENCY", "8"))
+        )
+
+    @staticmethod
+    def key(agent: Agent, prompt: str) -> str:
+        """sha256 of everything that determines the agent's answer."""
+        payload = json.dumps(
+            {"model": str(agent.model), "agent": agent.name, "prompt": prompt},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _scope(agent: Agent, language: str) -> str:
+        # Semantic matches only count for the same agent on the same model,
+        # and for code submitted as the same language
+        return f"{agent.model}\0{agent.name}\0{language}"
+
+    async def embed(self, code: str, language: str) -> CodeEmbedding | None:
+        """Embed the submitted code once per request (None if disabled)."""
+        semantic = self.semantic
+        if semantic is None:
+            return None
+        # Embedding is CPU work — keep it off the event loop
+        try:
+            vectors = await asyncio.to_thread(semantic.embed, code)
+        except Exception:
+            # The cache must never fail a generation — e.g. the model
+            # download failed. Carry on with the exact cache only.
+            logger.exception("Embedding failed; semantic cache disabled")
+            self.semantic = None
+            return None
+        if vectors is None:
+            return None
+        return CodeEmbedding(language, vectors)
+
+    async def get_or_run(
+        self,
+        agent: Agent,
+        prompt: str,
+        embedding: Awaitable[CodeEmbedding | None] | None = None
+    ) -> str:
+        """
+        Return the agent's output for this prompt, calling the LLM only
+        when neither the exact nor the semantic cache has an answer.
+
+        Args:
+            agent:     The agent to run.
+            prompt:    The full user message for the agent.
+            embedding: A task wrapping embed(code, language), or None to
+                       skip the semantic lookup. Passing a task (not a
+                       finished vector) lets the embedding finish in the
+                       background.
+
+        Returns:
+            The agent's final output as a string.
+        """
+        key = self.key(agent, prompt)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        # Check the semantic cache first and only call the LLM on a miss.
+        # The embedding task was started with the pipeline, so it has
+        # usually finished by now and this costs next to nothing.
+        cached, code_embedding = await self._semantic_lookup(agent, embedding)
+        if cached is not None:
+            return cached
+
+        self.stats["misses"] += 1
+        result = await self._run(agent, prompt)
+        output = result.final_output
+
+        await self._store(agent, key, output, code_embedding)
+        return output
+
+    async def stream_or_run(
+        self,
+        agent: Agent,
+        prompt: str,
+        embedding: Awaitable[CodeEmbedding | None] | None = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streaming version of get_or_run().
+
+        Yields the agent's output as text deltas while the LLM produces
+        them. A cached answer is yielded in one piece.
+
+        Args:
+            agent:     The agent to run.
+            prompt:    The full user message for the agent.
+            embedding: A task wrapping embed(code, language), or None.
+
+        Yields:
+            Strings — consecutive pieces of the agent's output.
+        """
+        key = self.key(agent, prompt)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            yield cached
+            return
+
+        # Check the semantic cache before taking a concurrency slot, so
+        # waiting for the embedding never blocks other users' LLM calls.
+        # The embedding task was started with the pipeline, so by the time
+        # a streamed step gets here it has usually finished already.
+        cached, code_embedding = await self._semantic_lookup(agent, embedding)
+        if cached is not None:
+            yield cached
+            return
+
+        self.stats["misses"] += 1
+        # The concurrency slot is held for the whole stream
+        async with self._limit:
+            result = Runner.run_streamed(agent, prompt)
+            # stream_events() also reports tool calls, agent updates etc.
+            # We only want the raw text deltas from the model's response.
+            try:
+                async for event in result.stream_events():
+                    if (
+                        event.type == "raw_response_event"
+                        and isinstance(event.data, ResponseTextDeltaEvent)
+                    ):
+                        yield event.data.delta
+            finally:
+                # If the caller stopped listening early (e.g. the user
+                # closed the page), stop the run instead of paying for
+                # the rest of it.
+                if not result.is_complete:
+                    result.cancel()
+
+        await self._store(agent, key, result.final_output, code_embedding)
+
+    async def _run(self, agent: Agent, prompt: str):
+        """Runner.run(), limited to `concurrency` calls at a time."""
+        async with self._limit:
+            return await Runner.run(agent, prompt)
+
+    async def _semantic_lookup(
+        self,
+        agent: Agent,
+        embedding: Awaitable[CodeEmbedding | None] | None
+    ) -> tuple[str | None, CodeEmbedding | None]:
+        """Return (cached output or None, code embedding or None)."""
+        if self.semantic is None or embedding is None:
+            return None, None
+        code_embedding = await embedding
+        if code_embedding is None or self.semantic is None:
+            return None, None
+        similar_key = self.semantic.lookup(
+            self._scope(agent, code_embedding.language),
+            code_embedding.vectors
+        )
+        if similar_key is not None:
+            cached = await self.backend.get(similar_key)
+            if cached is not None:
+                self.stats["semantic_hits"] += 1
+                return cached, code_embedding
+        return None, code_embedding
+
+    async def _store(
+        self,
+        agent: Agent,
+        key: str,
+        output: str,
+        code_embedding: CodeEmbedding | None
+    ) -> None:
+        await self.backend.set(key, output, self.ttl)
+        # self.semantic is None if embedding failed while this call ran
+        if code_embedding is not None and self.semantic is not None:
+            self.semantic.add(
+                self._scope(agent, code_embedding.language),
+                code_embedding.vectors,
+                key
+            )
@@ -0,0 +1,650 @@
+# ================================================================
+# app/static_analyzer.py
+# Local, deterministic replacement for the Code Analyst agent.
+# Used by app/agents.py — never run directly.
+# ================================================================
+
+# Why not ask the LLM?
+# Most of the Code Analyst's job — listing functions, classes,
+# parameters, return types, exceptions and dependencies — is exactly
+# what a parser already knows. Reading it straight from the syntax tree
+# takes milliseconds instead of a 5–15 second LLM round trip, costs
+# nothing, and never hallucinates a parameter.
+#
+# Python is parsed with the built-in ast module, JavaScript with
+# tree-sitter. static_analyze() returns None for code that does not
+# parse, and the pipeline falls back to the LLM Code Analyst.
+
+import ast
+import copy
+from dataclasses import dataclass, field
+
+# tree-sitter — a fast incremental parser; the grammar comes separately
+import tree_sitter_javascript
+from tree_sitter import Language, Parser
+
+
+# Long default values and constants are cut to this many characters
+MAX_VALUE_LENGTH = 60
+
+
+# ── What we extract ───────────────────────────────────────────────────────
+#
+# Both languages fill in the same small records, so the Markdown
+# formatting at the bottom of this file is shared.
+
+@dataclass
+class ParamInfo:
+    name: str
+    type: str | None = None
+    default: str | None = None
+
+
+@dataclass
+class FunctionInfo:
+    name: str
+    # The parameter list as written, e.g. "a, *, b=1" (self/cls dropped)
+    signature: str = ""
+    params: list[ParamInfo] = field(default_factory=list)
+    returns: str = "not annotated"
+    doc: str | None = None
+    raises: list[str] = field(default_factory=list)
+    calls: list[str] = field(default_factory=list)
+    notes: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ClassInfo:
+    name: str
+    bases: list[str] = field(default_factory=list)
+    doc: str | None = None
+    attributes: list[str] = field(default_factory=list)
+    methods: list[FunctionInfo] = field(default_factory=list)
+    notes: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ModuleInfo:
+    language: str
+    doc: str | None = None
+    imports: list[str] = field(default_factory=list)
+    globals: list[str] = field(default_factory=list)
+    functions: list[FunctionInfo] = field(default_factory=list)
+    classes: list[ClassInfo] = field(default_factory=list)
+
+
+# ── Entry point ───────────────────────────────────────────────────────────
+
+def static_analyze(
+    code: str, language: str, tree: ast.Module | None = None
+) -> str | None:
+    """
+    Produce the Code Analyst's structured analysis without an LLM.
+
+    Args:
+        code:     The raw source code.
+        language: 'Python' or 'JavaScript'.
+        tree:     The already-parsed Python module, if the caller has
+                  one — saves parsing a large file a second time.
+
+    Returns:
+        The analysis as Markdown, or None if this language (or this
+        code, because it does not parse) cannot be analysed locally.
+    """
+    if language == "Python":
+        try:
+            module = _analyze_python(code, tree)
+        except SyntaxError:
+            return None
+    elif language == "JavaScript":
+        module = _analyze_javascript(code)
+        if module is None:
+            return None
+    else:
+        return None
+    return _format_module(module)
+
+
+# ── Helpers shared by both languages ──────────────────────────────────────
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) > MAX_VALUE_LENGTH:
+        return text[:MAX_VALUE_LENGTH - 1] + "…"
+    return text
+
+
+def _first_paragraph(doc: str | None) -> str | None:
+    if not doc:
+        return None
+    return " ".join(doc.strip().split("\n\n")[0].split())
+
+
+def _unique(items: list[str]) -> list[str]:
+    # Remove duplicates but keep the order they first appeared in
+    return list(dict.fromkeys(items))
+
+
+# ── Python — the built-in ast module ──────────────────────────────────────
+
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+_SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+_BLOCK_NODES = (ast.If, ast.Try, ast.TryStar, ast.With, ast.AsyncWith)
+
+
+def _walk_local(node: ast.AST):
+    """Like ast.walk(), but does not descend into nested functions/classes."""
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, _SCOPE_NODES):
+            yield from _walk_local(child)
+
+
+def _python_statements(body: list[ast.stmt]):
+    """
+    The statements of a module or class body, including those nested in
+    if / try / with blocks — e.g. "try: import ujson as json" or
+    "if sys.platform == 'win32': def ...". Function bodies are not entered.
+    """
+    for node in body:
+        if not isinstance(node, _BLOCK_NODES):
+            yield node
+            continue
+        yield from _python_statements(node.body)
+        if isinstance(node, (ast.Try, ast.TryStar)):
+            for handler in node.handlers:
+                yield from _python_statements(handler.body)
+            yield from _python_statements(node.finalbody)
+        if isinstance(node, (ast.If, ast.Try, ast.TryStar)):
+            yield from _python_statements(node.orelse)
+
+
+def _analyze_python(code: str, tree: ast.Module | None = None) -> ModuleInfo:
+    if tree is None:
+        tree = ast.parse(code.removeprefix("\ufeff"))
+    module = ModuleInfo(language="Python", doc=ast.get_docstring(tree))
+
+    for node in _python_statements(tree.body):
+        if isinstance(node, ast.Import):
+            module.imports.extend(
+                f"import {alias.name}"
+                + (f" as {alias.asname}" if alias.asname else "")
+                for alias in node.names
+            )
+        elif isinstance(node, ast.ImportFrom):
+            names = ", ".join(alias.name for alias in node.names)
+            source = "." * node.level + (node.module or "")
+            module.imports.append(f"from {source} import {names}")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            module.globals.extend(_python_assignment(node))
+        elif isinstance(node, _FUNCTION_NODES):
+            module.functions.append(_python_function(node))
+        elif isinstance(node, ast.ClassDef):
+            module.classes.append(_python_class(node))
+
+    return module
+
+
+def _python_assignment(node: ast.Assign | ast.AnnAssign) -> list[str]:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    value = f" = `{_shorten(ast.unparse(node.value))}`" if node.value else ""
+    annotation = (
+        f": `{ast.unparse(node.annotation)}`"
+        if isinstance(node, ast.AnnAssign) else ""
+    )
+    return [
+        f"`{ast.unparse(target)}`{annotation}{value}"
+        + (" (constant)" if ast.unparse(target).isupper() else "")
+        for target in targets
+    ]
+
+
+def _python_params(args: ast.arguments) -> list[ParamInfo]:
+    params = []
+
+    # Positional parameters share one list of defaults, aligned to the end
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+    for arg, default in zip(positional, defaults):
+        params.append(_python_param(arg, default))
+
+    if args.vararg:
+        params.append(_python_param(args.vararg, None, prefix="*"))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(_python_param(arg, default))
+    if args.kwarg:
+        params.append(_python_param(args.kwarg, None, prefix="**"))
+
+    return params
+
+
+def _python_signature(args: ast.arguments, is_method: bool) -> str:
+    # ast.unparse() keeps the bare "*" and "/" markers, which the
+    # parameter list alone cannot show
+    if is_method:
+        args = copy.copy(args)
+        if args.posonlyargs and args.posonlyargs[0].arg in ("self", "cls"):
+            args.posonlyargs = args.posonlyargs[1:]
+        elif args.args and args.args[0].arg in ("self", "cls"):
+            args.args = args.args[1:]
+    return ast.unparse(args)
+
+
+def _python_param(
+    arg: ast.arg,
+    default: ast.expr | None,
+    prefix: str = ""
+) -> ParamInfo:
+    return ParamInfo(
+        name=prefix + arg.arg,
+        type=ast.unparse(arg.annotation) if arg.annotation else None,
+        default=_shorten(ast.unparse(default)) if default else None
+    )
+
+
+def _python_function(
+    node: ast.FunctionDef | ast.AsyncFunctionDef,
+    is_method: bool = False
+) -> FunctionInfo:
+    params = _python_params(node.args)
+    # self / cls are implied for methods — not worth documenting
+    if is_method and params and params[0].name in ("self", "cls"):
+        params = params[1:]
+
+    fn = FunctionInfo(
+        name=node.name,
+        signature=_python_signature(node.args, is_method),
+        params=params,
+        doc=_first_paragraph(ast.get_docstring(node))
+    )
+
+    returns_value = False
+    is_generator = False
+    for child in _walk_local(node):
+        if isinstance(child, ast.Return) and child.value is not None:
+            returns_value = True
+        elif isinstance(child, (ast.Yield, ast.YieldFrom)):
+            is_generator = True
+        elif isinstance(child, ast.Raise):
+            if child.exc is None:
+                fn.raises.append("re-raises the current exception")
+            elif isinstance(child.exc, ast.Call):
+                fn.raises.append(ast.unparse(child.exc.func))
+            else:
+                fn.raises.append(ast.unparse(child.exc))
+        elif isinstance(child, ast.Call):
+            fn.calls.append(ast.unparse(child.func))
+        elif isinstance(child, ast.ExceptHandler):
+            caught = ast.unparse(child.type) if child.type else "everything"
+            fn.notes.append(f"catches {caught}")
+        elif isinstance(child, ast.Assert):
+            fn.notes.append(f"asserts `{_shorten(ast.unparse(child.test))}`")
+
+    if node.returns is not None:
+        fn.returns = f"`{ast.unparse(node.returns)}`"
+    elif is_generator:
+        fn.returns = "not annotated — generator (uses yield)"
+    elif returns_value:
+        fn.returns = "not annotated — returns a value"
+    else:
+        fn.returns = "not annotated — returns None"
+
+    if isinstance(node, ast.AsyncFunctionDef) and is_generator:
+        fn.notes.insert(0, "async generator (iterate with async for)")
+    elif isinstance(node, ast.AsyncFunctionDef):
+        fn.notes.insert(0, "async (must be awaited)")
+    elif is_generator:
+        fn.notes.append("generator")
+    fn.notes.extend(
+        f"decorated with @{ast.unparse(d)}" for d in node.decorator_list
+    )
+    fn.notes.extend(
+        f"`{p.name}` defaults to None" for p in fn.params if p.default == "None"
+    )
+
+    fn.raises = _unique(fn.raises)
+    # "raise ValueError(...)" is listed under Raises, not as a dependency
+    fn.calls = [call for call in _unique(fn.calls) if call not in fn.raises]
+    fn.notes = _unique(fn.notes)
+    return fn
+
+
+def _python_class(node: ast.ClassDef) -> ClassInfo:
+    cls = ClassInfo(
+        name=node.name,
+        bases=[ast.unparse(base) for base in node.bases],
+        doc=_first_paragraph(ast.get_docstring(node)),
+        notes=[f"decorated with @{ast.unparse(d)}" for d in node.decorator_list]
+    )
+
+    for child in _python_statements(node.body):
+        if isinstance(child, (ast.Assign, ast.AnnAssign)):
+            cls.attributes.extend(_python_assignment(child))
+        elif isinstance(child, _FUNCTION_NODES):
+            cls.methods.append(_python_function(child, is_method=True))
+            # Instance attributes: every "self.x = ..." inside a method
+            for sub in _walk_local(child):
+                targets = (
+                    sub.targets if isinstance(sub, ast.Assign)
+                    else [sub.target] if isinstance(sub, ast.AnnAssign)
+                    else []
+                )
+                cls.attributes.extend(
+                    f"`{ast.unparse(t)}` (set in `{child.name}`)"
+                    for t in targets
+                    if isinstance(t, ast.Attribute)
+                    and isinstance(t.value, ast.Name)
+                    and t.value.id == "self"
+                )
+
+    cls.attributes = _unique(cls.attributes)
+    return cls
+
+
+# ── JavaScript — tree-sitter ──────────────────────────────────────────────
+
+_JS_FUNCTION_VALUES = (
+    "arrow_function", "function_expression", "function",
+    "generator_function"
+)
+_JS_SCOPE_NODES = (
+    "function_declaration", "generator_function_declaration",
+    "class_declaration", "class", "method_definition"
+) + _JS_FUNCTION_VALUES
+
+_js_parser = None
+
+
+def _js_text(node) -> str:
+    return node.text.decode("utf-8")
+
+
+def _js_walk_local(node):
+    """Walk a subtree without descending into nested functions/classes."""
+    for child in node.named_children:
+        yield child
+        if child.type not in _JS_SCOPE_NODES:
+            yield from _js_walk_local(child)
+
+
+def _js_doc(node) -> str | None:
+    """The /** JSDoc */ comment directly above a node, if any."""
+    # The comment belongs to the export statement when there is one
+    if node.parent is not None and node.parent.type == "export_statement":
+        node = node.parent
+    previous = node.prev_named_sibling
+    if previous is None or previous.type != "comment":
+        return None
+    text = _js_text(previous)
+    if not text.startswith("/**"):
+        return None
+    lines = [
+        line.strip().lstrip("*").strip()
+        for line in text[3:-2].splitlines()
+    ]
+    # Stop at the first @tag — the summary is what we want
+    summary = []
+    for line in lines:
+        if line.startswith("@"):
+            break
+        summary.append(line)
+    return _first_paragraph("\n".join(summary))
+
+
+def _analyze_javascript(code: str) -> ModuleInfo | None:
+    global _js_parser
+    if _js_parser is None:
+        _js_parser = Parser(Language(tree_sitter_javascript.language()))
+
+    tree = _js_parser.parse(code.encode("utf-8"))
+    # tree-sitter always returns a tree, patching over syntax errors.
+    # An analysis of a patched tree could be wrong, so leave it to the LLM.
+    if tree.root_node.has_error:
+        return None
+    module = ModuleInfo(language="JavaScript")
+
+    for node in tree.root_node.named_children:
+        # "export function f() {}" — analyse what is being exported
+        if node.type == "export_statement":
+            declaration = node.child_by_field_name("declaration")
+            if declaration is None:
+                continue
+            node = declaration
+
+        if node.type == "import_statement":
+            module.imports.append(_shorten(_js_text(node)))
+        elif node.type in (
+            "function_declaration", "generator_function_declaration"
+        ):
+            module.functions.append(_js_function(node))
+        elif node.type == "class_declaration":
+            module.classes.append(_js_class(node))
+        elif node.type in ("lexical_declaration", "variable_declaration"):
+            kind = node.children[0].type  # const / let / var
+            for declarator in node.named_children:
+                if declarator.type != "variable_declarator":
+                    continue
+                name = declarator.child_by_field_name("name")
+                value = declarator.child_by_field_name("value")
+                if value is not None and value.type in _JS_FUNCTION_VALUES:
+                    module.functions.append(
+                        _js_function(value, name=_js_text(name))
+                    )
+                elif value is not None and _js_is_require(value):
+                    module.imports.append(_shorten(_js_text(node)))
+                else:
+                    shown = f" = `{_shorten(_js_text(value))}`" if value else ""
+                    module.globals.append(
+                        f"`{_js_text(name)}`{shown}"
+                        + (" (constant)" if kind == "const" else "")
+                    )
+
+    return module
+
+
+def _js_is_require(node) -> bool:
+    function = node.child_by_field_name("function")
+    return (
+        node.type == "call_expression"
+        and function is not None
+        and _js_text(function) == "require"
+    )
+
+
+def _js_params(node) -> list[ParamInfo]:
+    params = []
+    parameters = node.child_by_field_name("parameters")
+    if parameters is None:
+        # Single bare parameter: x => x * 2
+        parameter = node.child_by_field_name("parameter")
+        return [ParamInfo(name=_js_text(parameter))] if parameter else []
+
+    for param in parameters.named_children:
+        if param.type == "assignment_pattern":
+            params.append(ParamInfo(
+                name=_js_text(param.child_by_field_name("left")),
+                default=_shorten(_js_text(param.child_by_field_name("right")))
+            ))
+        elif param.type != "comment":
+            params.append(ParamInfo(name=_js_text(param)))
+    return params
+
+
+def _js_signature(node) -> str:
+    parameters = node.child_by_field_name("parameters")
+    if parameters is None:
+        parameter = node.child_by_field_name("parameter")
+        return _js_text(parameter) if parameter else ""
+    # "(a, { b, c } = {}, ...rest)" → "a, { b, c } = {}, ...rest"
+    return " ".join(_js_text(parameters)[1:-1].split())
+
+
+def _js_function(node, name: str | None = None) -> FunctionInfo:
+    if name is None:
+        name_node = node.child_by_field_name("name")
+        name = _js_text(name_node) if name_node else "(anonymous)"
+
+    fn = FunctionInfo(
+        name=name,
+        signature=_js_signature(node),
+        params=_js_params(node),
+        doc=_js_doc(node)
+    )
+
+    returns_value = False
+    body = node.child_by_field_name("body")
+    # Arrow functions with an expression body return that expression
+    if body is not None and body.type != "statement_block":
+        returns_value = True
+
+    is_generator = node.type in (
+        "generator_function_declaration", "generator_function"
+    )
+    for child in _js_walk_local(node):
+        if child.type == "return_statement" and child.named_child_count:
+            returns_value = True
+        elif child.type == "yield_expression":
+            is_generator = True
+        elif child.type == "throw_statement" and child.named_child_count:
+            thrown = child.named_children[0]
+            constructor = thrown.child_by_field_name("constructor")
+            fn.raises.append(
+                _js_text(constructor) if constructor else _shorten(_js_text(thrown))
+            )
+        elif child.type == "call_expression":
+            fn.calls.append(_js_text(child.child_by_field_name("function")))
+        elif child.type == "catch_clause":
+            fn.notes.append("catches errors (try/catch)")
+
+    if is_generator:
+        fn.returns = "generator (uses yield)"
+    elif returns_value:
+        fn.returns = "returns a value (JavaScript — type not declared)"
+    else:
+        fn.returns = "returns undefined"
+
+    if any(child.type == "async" for child in node.children):
+        fn.notes.insert(0, "async (returns a Promise)")
+    for keyword in ("static", "get", "set"):
+        if any(child.type == keyword for child in node.children):
+            fn.notes.append(f"{keyword} method")
+
+    fn.raises = _unique(fn.raises)
+    fn.calls = _unique(fn.calls)
+    fn.notes = _unique(fn.notes)
+    return fn
+
+
+def _js_class(node) -> ClassInfo:
+    cls = ClassInfo(name=_js_text(node.child_by_field_name("name")))
+    cls.doc = _js_doc(node)
+
+    for child in node.named_children:
+        if child.type == "class_heritage":
+            cls.bases = [_js_text(base) for base in child.named_children]
+
+    body = node.child_by_field_name("body")
+    for member in body.named_children:
+        if member.type == "method_definition":
+            cls.methods.append(_js_function(
+                member, name=_js_text(member.child_by_field_name("name"))
+            ))
+            # Instance attributes: every "this.x = ..." inside a method
+            for sub in _js_walk_local(member):
+                left = (
+                    sub.child_by_field_name("left")
+                    if sub.type == "assignment_expression" else None
+                )
+                if left is not None and _js_text(left).startswith("this."):
+                    cls.attributes.append(
+                        f"`{_js_text(left)}` (set in "
+                        f"`{cls.methods[-1].name}`)"
+                    )
+        elif member.type == "field_definition":
+            cls.attributes.append(f"`{_shorten(_js_text(member))}`")
+
+    cls.attributes = _unique(cls.attributes)
+    return cls
+
+
+# ── Markdown output ───────────────────────────────────────────────────────
+#
+# Mirrors what the LLM Code Analyst is asked to produce, so the
+# Documentation Writer does not need to know where the analysis came from.
+
+def _format_module(module: ModuleInfo) -> str:
+    n_methods = sum(len(cls.methods) for cls in module.classes)
+    lines = [
+        f"# {module.language} Code Analysis",
+        "",
+        "_Extracted by static analysis. Behaviour and edge cases beyond "
+        "those listed must be inferred from the original code._",
+        "",
+        "## Overview",
+        "",
+        f"- **Module docstring:** {_first_paragraph(module.doc) or 'none'}",
+        f"- **Contents:** {len(module.functions)} function(s), "
+        f"{len(module.classes)} class(es), {n_methods} method(s)",
+        "",
+        "## Imports",
+        "",
+    ]
+    lines += [f"- `{item}`" for item in module.imports] or ["- none"]
+    lines += ["", "## Global Variables and Constants", ""]
+    lines += [f"- {item}" for item in module.globals] or ["- none"]
+
+    if module.functions:
+        lines += ["", "## Functions"]
+        for fn in module.functions:
+            lines += [""] + _format_function(fn, "###")
+
+    if module.classes:
+        lines += ["", "## Classes"]
+        for cls in module.classes:
+            lines += [""] + _format_class(cls)
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_function(fn: FunctionInfo, heading: str) -> list[str]:
+    lines = [
+        f"{heading} `{fn.name}({fn.signature})`",
+        "",
+        f"- **Purpose:** {fn.doc or 'no docstring — infer from the code'}",
+    ]
+
+    if fn.params:
+        lines.append("- **Parameters:**")
+        for p in fn.params:
+            detail = f"`{p.type}`" if p.type else "type not annotated"
+            if p.default is not None:
+                detail += f", default `{p.default}`"
+            lines.append(f"  - `{p.name}` — {detail}")
+    else:
+        lines.append("- **Parameters:** none")
+
+    lines.append(f"- **Returns:** {fn.returns}")
+    raises = ", ".join(f"`{r}`" for r in fn.raises)
+    lines.append(f"- **Raises:** {raises or 'nothing raised explicitly'}")
+    calls = ", ".join(f"`{c}`" for c in fn.calls)
+    lines.append(f"- **Dependencies:** {calls or 'no calls'}")
+    if fn.notes:
+        lines.append(f"- **Notes / edge cases:** {'; '.join(fn.notes)}")
+    return lines
+
+
+def _format_class(cls: ClassInfo) -> list[str]:
+    bases = f"({', '.join(cls.bases)})" if cls.bases else ""
+    lines = [
+        f"### class `{cls.name}{bases}`",
+        "",
+        f"- **Purpose:** {cls.doc or 'no docstring — infer from the code'}",
+    ]
+    if cls.attributes:
+        lines.append("- **Attributes:**")
+        lines += [f"  - {attribute}" for attribute in cls.attributes]
+    if cls.notes:
+        lines.append(f"- **Notes:** {'; '.join(cls.notes)}")
+    for method in cls.methods:
+        lines += [""] + _format_function(method, "####")
+    return lines
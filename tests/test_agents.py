@@ -0,0 +1,202 @@
+# ================================================================
+# tests/test_agents.py
+# Tests for the local parts of app/agents.py — no LLM is called.
+# The shared-run tests replace _stream_pipeline() with a fake that the
+# test feeds step by step.
+# Run from the project root:  uv run python -m unittest
+# ================================================================
+
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+# app.agents copies the OpenRouter key into the environment on import
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+
+from app.agents import _INFLIGHT, _triage, stream_pipeline
+from app.static_analyzer import static_analyze
+
+
+class TriageTest(unittest.TestCase):
+
+    def test_valid_python_with_byte_order_mark_is_accepted(self):
+        code = "\ufeffdef f():\n    return 1\n"
+        path, message, tree = _triage(code, "Python")
+        self.assertEqual(path, "quick")
+        self.assertIsNone(message)
+        self.assertIsNotNone(tree)
+
+    def test_invalid_python_is_rejected(self):
+        path, message, tree = _triage("def f(:\n", "Python")
+        self.assertEqual(path, "rejected")
+        self.assertIn("line 1", message)
+        self.assertIsNone(tree)
+
+    def test_larger_input_takes_the_full_path(self):
+        code = "".join(
+            f"def f{i}(x):\n    return x + {i}\n\n" for i in range(40)
+        )
+        path, _, _ = _triage(code, "Python")
+        self.assertEqual(path, "full")
+
+    def test_parsed_tree_gives_the_same_analysis(self):
+        code = (
+            "\ufeffimport os\n\n"
+            "def a(x):\n    return x\n\n"
+            "def b(y):\n    pass\n"
+        )
+        _, _, tree = _triage(code, "Python")
+        self.assertEqual(
+            static_analyze(code, "Python", tree),
+            static_analyze(code, "Python")
+        )
+
+    def test_javascript_is_not_parsed_here(self):
+        path, _, tree = _triage("const f = x => x;", "JavaScript")
+        self.assertEqual(path, "quick")
+        self.assertIsNone(tree)
+
+
+
+# ── Sharing identical runs ────────────────────────────────────────────────
+
+class FakePipeline:
+    """
+    Stands in for _stream_pipeline(). Each item put on `steps` is a list
+    of final-doc deltas (sent to the sink, then yielded as one chunk), an
+    exception to raise, or None to finish.
+    """
+
+    def __init__(self):
+        self.steps = asyncio.Queue()
+        self.runs = 0
+        self.cancelled = False
+
+    async def __call__(self, code, language, sink=None):
+        self.runs += 1
+        text = ""
+        try:
+            while True:
+                step = await self.steps.get()
+                if step is None:
+                    return
+                if isinstance(step, Exception):
+                    raise step
+                for delta in step:
+                    await sink(delta)
+                    text += delta
+                yield text
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def settle():
+    # Let every other task run until it blocks again
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+class SharedRunTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pipeline = FakePipeline()
+        patcher = mock.patch("app.agents._stream_pipeline", self.pipeline)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.assertEqual(_INFLIGHT, {})
+
+    def subscribe(self, code: str = "x = 1"):
+        """Start a subscriber; returns (task, sink writes, chunks seen)."""
+        written, chunks = [], []
+
+        async def sink(text):
+            written.append(text)
+
+        async def consume():
+            async for chunk in stream_pipeline(code, "Python", sink):
+                chunks.append(chunk)
+
+        # A broken hand-off would otherwise hang the test run forever
+        task = asyncio.create_task(asyncio.wait_for(consume(), timeout=5))
+        return task, written, chunks
+
+    async def test_late_joiner_receives_the_full_sink_content(self):
+        first, first_written, first_chunks = self.subscribe()
+        await self.pipeline.steps.put(["Hello", ", "])
+        await settle()
+        self.assertEqual(first_chunks, ["Hello, "])
+
+        late, late_written, late_chunks = self.subscribe()
+        await self.pipeline.steps.put(["world"])
+        await self.pipeline.steps.put(None)
+        await asyncio.gather(first, late)
+
+        self.assertEqual(self.pipeline.runs, 1)
+        self.assertEqual("".join(first_written), "Hello, world")
+        self.assertEqual("".join(late_written), "Hello, world")
+        self.assertEqual(late_chunks[-1], "Hello, world")
+
+    async def test_sink_is_written_once_per_chunk(self):
+        task, written, _ = self.subscribe()
+        await self.pipeline.steps.put(["a", "b", "c"])
+        await settle()
+        await self.pipeline.steps.put(["d"])
+        await self.pipeline.steps.put(None)
+        await task
+
+        # One write per chunk, not one per delta
+        self.assertEqual(written, ["abc", "d"])
+
+    async def test_error_is_raised_in_every_subscriber(self):
+        first, _, _ = self.subscribe()
+        second, _, _ = self.subscribe()
+        await settle()
+        await self.pipeline.steps.put(RuntimeError("LLM down"))
+
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+            self.assertEqual(str(result), "LLM down")
+        self.assertEqual(self.pipeline.runs, 1)
+
+    async def test_last_subscriber_leaving_cancels_the_run(self):
+        first, _, _ = self.subscribe()
+        second, _, _ = self.subscribe()
+        await self.pipeline.steps.put(["partial"])
+        await settle()
+        (run,) = _INFLIGHT.values()
+
+        first.cancel()
+        await settle()
+        # One listener is still there — the run carries on
+        self.assertFalse(run.task.done())
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await settle()
+        self.assertTrue(run.task.cancelled())
+        self.assertTrue(self.pipeline.cancelled)
+        self.assertEqual(_INFLIGHT, {})
+
+    async def test_new_request_after_completion_starts_a_new_run(self):
+        first, _, first_chunks = self.subscribe()
+        await self.pipeline.steps.put(["old docs"])
+        await self.pipeline.steps.put(None)
+        await first
+
+        second, _, second_chunks = self.subscribe()
+        await self.pipeline.steps.put(["new docs"])
+        await self.pipeline.steps.put(None)
+        await second
+
+        self.assertEqual(self.pipeline.runs, 2)
+        self.assertEqual(first_chunks, ["old docs"])
+        self.assertEqual(second_chunks, ["new docs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+# ================================================================
+# tests/test_llm_cache.py
+# Tests for app/llm_cache.py — Runner and the embedding model are
+# replaced by small fakes, so no LLM or model download is needed.
+# Run from the project root:  uv run python -m unittest
+# ================================================================
+
+import asyncio
+import types
+import unittest
+from unittest import mock
+
+from agents import Agent
+from openai.types.responses import ResponseTextDeltaEvent
+
+from app.llm_cache import LLMCache, MemoryBackend, SemanticIndex
+
+
+# ── Fakes ─────────────────────────────────────────────────────────────────
+
+def _delta_event(text: str):
+    return types.SimpleNamespace(
+        type="raw_response_event",
+        data=ResponseTextDeltaEvent(
+            content_index=0, delta=text, item_id="item", output_index=0,
+            sequence_number=0, type="response.output_text.delta", logprobs=[]
+        )
+    )
+
+
+class FakeStream:
+    """Stands in for RunResultStreaming: small deltas, then final_output."""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.final_output = None
+        self.is_complete = False
+        self.cancelled = False
+
+    async def stream_events(self):
+        for i in range(0, len(self.output), 4):
+            await asyncio.sleep(0)
+            yield _delta_event(self.output[i:i + 4])
+        self.final_output = self.output
+        self.is_complete = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeRunner:
+    """Stands in for agents.Runner and records every prompt it is given."""
+
+    def __init__(self):
+        self.prompts = []
+        self.streams = []
+
+    async def run(self, agent, prompt):
+        self.prompts.append(prompt)
+        return types.SimpleNamespace(final_output=f"docs for {prompt}")
+
+    def run_streamed(self, agent, prompt):
+        self.prompts.append(prompt)
+        stream = FakeStream(f"docs for {prompt}")
+        self.streams.append(stream)
+        return stream
+
+
+class FakeModel:
+    """
+    Stands in for SentenceTransformer. One word is one token, and a chunk
+    containing "alpha" embeds to [1, 0], anything else to [0, 1].
+    """
+
+    max_seq_length = 6  # → 4 tokens per chunk after the special tokens
+
+    def tokenizer(self, lines, add_special_tokens, verbose):
+        return {"input_ids": [line.split() for line in lines]}
+
+    def encode(self, chunks, normalize_embeddings):
+        return types.SimpleNamespace(tolist=lambda: [
+            [1.0, 0.0] if "alpha" in chunk else [0.0, 1.0]
+            for chunk in chunks
+        ])
+
+
+def make_semantic_index() -> SemanticIndex:
+    # sentence-transformers is optional — pretend it is installed
+    with mock.patch("importlib.util.find_spec", return_value=object()):
+        index = SemanticIndex(threshold=0.95)
+    index._model = FakeModel()
+    return index
+
+
+AGENT = Agent(name="Documentation Writer", instructions="-", model="m")
+
+
+# ── MemoryBackend ─────────────────────────────────────────────────────────
+
+class MemoryBackendTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        backend = MemoryBackend(max_entries=2)
+        await backend.set("a", "1", ttl=60)
+        await backend.set("b", "2", ttl=60)
+        await backend.get("a")               # "b" is now least recent
+        await backend.set("c", "3", ttl=60)
+
+        self.assertEqual(await backend.get("a"), "1")
+        self.assertIsNone(await backend.get("b"))
+        self.assertEqual(await backend.get("c"), "3")
+
+    async def test_entry_expires_after_ttl(self):
+        backend = MemoryBackend()
+        with mock.patch("app.llm_cache.time.monotonic", return_value=100.0):
+            await backend.set("a", "1", ttl=10)
+        with mock.patch("app.llm_cache.time.monotonic", return_value=109.0):
+            self.assertEqual(await backend.get("a"), "1")
+        with mock.patch("app.llm_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(await backend.get("a"))
+
+
+# ── Exact cache ───────────────────────────────────────────────────────────
+
+class ExactCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.runner = FakeRunner()
+        patcher = mock.patch("app.llm_cache.Runner", self.runner)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = LLMCache()
+
+    async def stream(self, prompt: str) -> str:
+        return "".join([
+            delta async for delta in self.cache.stream_or_run(AGENT, prompt)
+        ])
+
+    async def test_get_or_run_miss_then_hit(self):
+        first = await self.cache.get_or_run(AGENT, "p")
+        second = await self.cache.get_or_run(AGENT, "p")
+
+        self.assertEqual(first, "docs for p")
+        self.assertEqual(second, first)
+        self.assertEqual(self.runner.prompts, ["p"])
+        self.assertEqual(self.cache.stats["misses"], 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    async def test_different_prompts_do_not_share_an_entry(self):
+        await self.cache.get_or_run(AGENT, "p")
+        await self.cache.get_or_run(AGENT, "q")
+        self.assertEqual(self.runner.prompts, ["p", "q"])
+
+    async def test_stream_or_run_stores_final_output(self):
+        streamed = await self.stream("p")
+
+        self.assertEqual(streamed, "docs for p")
+        self.assertEqual(
+            await self.cache.backend.get(LLMCache.key(AGENT, "p")),
+            "docs for p"
+        )
+
+    async def test_stream_or_run_hit_yields_cached_answer_whole(self):
+        await self.cache.get_or_run(AGENT, "p")
+        deltas = [
+            delta async for delta in self.cache.stream_or_run(AGENT, "p")
+        ]
+
+        self.assertEqual(deltas, ["docs for p"])
+        self.assertEqual(self.runner.prompts, ["p"])
+
+    async def test_nothing_stored_when_consumer_stops_early(self):
+        stream = self.cache.stream_or_run(AGENT, "p")
+        await anext(stream)
+        await stream.aclose()
+
+        self.assertTrue(self.runner.streams[0].cancelled)
+        self.assertIsNone(
+            await self.cache.backend.get(LLMCache.key(AGENT, "p"))
+        )
+        # The partial answer was not cached, so the next call runs again
+        await self.stream("p")
+        self.assertEqual(self.runner.prompts, ["p", "p"])
+
+
+# ── Semantic cache ────────────────────────────────────────────────────────
+
+class SemanticCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.runner = FakeRunner()
+        patcher = mock.patch("app.llm_cache.Runner", self.runner)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = LLMCache(semantic=make_semantic_index())
+
+    async def run_code(self, prompt: str, code: str, language="Python"):
+        embedding = asyncio.create_task(self.cache.embed(code, language))
+        return await self.cache.get_or_run(AGENT, prompt, embedding)
+
+    def test_code_is_split_into_line_aligned_chunks(self):
+        index = make_semantic_index()
+        chunks = index._chunks("alpha one\nalpha two\nalpha three\n")
+        self.assertEqual(chunks, ["alpha one\nalpha two\n", "alpha three\n"])
+
+    def test_line_longer_than_the_model_window_is_not_embedded(self):
+        index = make_semantic_index()
+        self.assertIsNone(index.embed("a b c d e f g\n"))
+
+    async def test_near_identical_code_reuses_the_answer(self):
+        await self.run_code("p1", "alpha one\n")
+        output = await self.run_code("p2", "alpha  one  \n")
+
+        self.assertEqual(output, "docs for p1")
+        # The hit was found before any LLM call was started
+        self.assertEqual(self.runner.prompts, ["p1"])
+        self.assertEqual(self.cache.stats["semantic_hits"], 1)
+
+    async def test_every_chunk_must_match(self):
+        await self.run_code("p1", "alpha one\nalpha two\nalpha three\n")
+        # Same first chunk, different second chunk
+        output = await self.run_code(
+            "p2", "alpha one\nalpha two\nbeta three\n"
+        )
+
+        self.assertEqual(output, "docs for p2")
+        self.assertEqual(self.cache.stats["semantic_hits"], 0)
+
+    async def test_matches_are_scoped_by_language(self):
+        await self.run_code("p1", "alpha one\n", "Python")
+        output = await self.run_code("p2", "alpha one\n", "JavaScript")
+
+        self.assertEqual(output, "docs for p2")
+        self.assertEqual(self.cache.stats["semantic_hits"], 0)
+
+    async def test_embedding_failure_falls_back_to_exact_cache(self):
+        self.cache.semantic._model.encode = mock.Mock(
+            side_effect=OSError("model download failed")
+        )
+        with self.assertLogs("app.llm_cache", level="ERROR"):
+            output = await self.run_code("p1", "alpha one\n")
+
+        self.assertEqual(output, "docs for p1")
+        self.assertIsNone(self.cache.semantic)
+        self.assertEqual(await self.run_code("p1", "alpha one\n"), output)
+        self.assertEqual(self.runner.prompts, ["p1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# ================================================================
+# tests/test_static_analyzer.py
+# Pins the Markdown produced by app/static_analyzer.py.
+# Run from the project root:  uv run python -m unittest
+# ================================================================
+
+import unittest
+from textwrap import dedent
+
+from app.static_analyzer import static_analyze
+
+
+def analyze_python(code: str) -> str:
+    return static_analyze(dedent(code), "Python")
+
+
+class PythonBlocksTest(unittest.TestCase):
+    """Definitions nested in if / try / with blocks are not missed."""
+
+    def test_imports_inside_try_except(self):
+        analysis = analyze_python("""
+            try:
+                import ujson as json
+            except ImportError:
+                import json
+        """)
+        self.assertIn("- `import ujson as json`", analysis)
+        self.assertIn("- `import json`", analysis)
+
+    def test_function_inside_if_else(self):
+        analysis = analyze_python("""
+            import sys
+            if sys.platform == "win32":
+                def home():
+                    return "C:/"
+            else:
+                def home():
+                    return "/"
+        """)
+        self.assertEqual(analysis.count("### `home()`"), 2)
+        self.assertIn("2 function(s)", analysis)
+
+    def test_class_and_global_inside_try_and_with(self):
+        analysis = analyze_python("""
+            try:
+                class Fast:
+                    pass
+            finally:
+                LIMIT = 10
+            with open("config.txt") as f:
+                CONFIG = f.read()
+        """)
+        self.assertIn("### class `Fast`", analysis)
+        self.assertIn("- `LIMIT` = `10` (constant)", analysis)
+        self.assertIn("- `CONFIG` = `f.read()` (constant)", analysis)
+
+    def test_method_inside_if_in_class_body(self):
+        analysis = analyze_python("""
+            class Cache:
+                if True:
+                    def clear(self):
+                        pass
+        """)
+        self.assertIn("#### `clear()`", analysis)
+
+    def test_function_bodies_are_not_entered(self):
+        analysis = analyze_python("""
+            def outer():
+                if True:
+                    def inner():
+                        pass
+        """)
+        self.assertNotIn("inner", analysis)
+
+
+class PythonSignatureTest(unittest.TestCase):
+    """Signatures are rendered as written, including * and / markers."""
+
+    def test_keyword_only_marker(self):
+        analysis = analyze_python("def kw(a, *, b=1): pass")
+        self.assertIn("### `kw(a, *, b=1)`", analysis)
+
+    def test_positional_only_marker(self):
+        analysis = analyze_python("def pos(a, b, /, c): pass")
+        self.assertIn("### `pos(a, b, /, c)`", analysis)
+
+    def test_varargs_and_annotations(self):
+        analysis = analyze_python(
+            "def f(x: int, *args, y=None, **kwargs) -> str: pass"
+        )
+        self.assertIn("### `f(x: int, *args, y=None, **kwargs)`", analysis)
+
+    def test_self_and_cls_are_dropped_from_methods(self):
+        analysis = analyze_python("""
+            class Shape:
+                def area(self, *, unit="cm"):
+                    pass
+
+                @classmethod
+                def make(cls, /, size):
+                    pass
+        """)
+        self.assertIn("#### `area(*, unit='cm')`", analysis)
+        self.assertIn("#### `make(size)`", analysis)
+
+    def test_invalid_python_is_left_to_the_llm(self):
+        self.assertIsNone(analyze_python("def broken(:"))
+
+
+class JavaScriptSignatureTest(unittest.TestCase):
+
+    def test_defaults_destructuring_and_rest(self):
+        analysis = static_analyze(
+            "function f(a, { b, c } = {}, ...rest) { return a; }",
+            "JavaScript"
+        )
+        self.assertIn("### `f(a, { b, c } = {}, ...rest)`", analysis)
+
+    def test_bare_arrow_parameter(self):
+        analysis = static_analyze("const double = x => x * 2;", "JavaScript")
+        self.assertIn("### `double(x)`", analysis)
+
+    def test_method_signature(self):
+        analysis = static_analyze(
+            "class K { m(p = 1) { this.p = p; } }", "JavaScript"
+        )
+        self.assertIn("#### `m(p = 1)`", analysis)
+
+    def test_invalid_javascript_is_left_to_the_llm(self):
+        self.assertIsNone(static_analyze("function f( {", "JavaScript"))
+
+
+if __name__ == "__main__":
+    unittest.main()